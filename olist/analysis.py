@@ -30,3 +30,123 @@ class WhatIfAnalysis:
             results.append((n_sellers_remaining, total_profit))
 
         return results
+
+
+class WhatIfService(WhatIfAnalysis):
+    '''
+    Precomputed backend for the interactive what-if widgets.
+    Sorting, cumulative sums and the seller -> items/customers/states
+    index are built once, so that each "remove the worst k sellers"
+    query is answered by array slicing.
+    Affected customers are counted when both `orders` and `customers`
+    are given.
+    '''
+    def __init__(self, seller_data, order_items, orders=None, customers=None,
+                 **kwargs):
+        super().__init__(seller_data, **kwargs)
+
+        # Sort sellers by increasing profits, as perform_analysis does
+        sorted_sellers = seller_data.sort_values(by='profits')\
+                                    .reset_index(drop=True)
+        self.sorted_sellers = sorted_sellers
+        n = len(sorted_sellers)
+        rank = pd.Series(np.arange(n), index=sorted_sellers['seller_id'])
+
+        # Cumulative profits and items: index k <=> the worst k sellers removed
+        profits = sorted_sellers['profits'].to_numpy(dtype=float)
+        items = sorted_sellers['number_of_items'].to_numpy(dtype=float)
+        self.profits_removed = np.concatenate([[0.], np.cumsum(profits)])
+        self.items_removed = np.concatenate([[0.], np.cumsum(items)])
+        n_sellers_remaining = n - np.arange(n + 1)
+        n_items_remaining = self.items_removed[-1] - self.items_removed
+        it_costs = self.update_it_costs(n_sellers_remaining, n_items_remaining)
+        self.profit_curve = self.profits_removed[-1] - self.profits_removed - it_costs
+
+        # Order items grouped by seller rank: items of the worst k sellers
+        # are the first item_offsets[k] rows
+        order_items = order_items[order_items['seller_id'].isin(rank.index)]
+        item_rank = rank.loc[order_items['seller_id']].to_numpy()
+        order = np.argsort(item_rank, kind='mergesort')
+        self.order_items = order_items.iloc[order].reset_index(drop=True)
+        self.item_offsets = np.searchsorted(item_rank[order], np.arange(n + 1))
+
+        # A customer is affected as soon as the lowest-ranked seller
+        # they bought from is removed (rank 0 is the worst seller).
+        # customer_id is unique per order, so group by customer_unique_id
+        if orders is not None and customers is not None:
+            order_customers = orders[['order_id', 'customer_id']]\
+                .merge(customers[['customer_id', 'customer_unique_id']],
+                       on='customer_id')
+            first_removed = self.order_items[['order_id']]\
+                .assign(seller_rank=item_rank[order])\
+                .merge(order_customers, on='order_id')\
+                .groupby('customer_unique_id')['seller_rank'].min()
+            self.customers_affected = np.concatenate(
+                [[0], np.cumsum(np.bincount(first_removed.to_numpy(), minlength=n))])
+        else:
+            self.customers_affected = None
+
+        # Per-state cumulative sellers and items removed, shape (n + 1, n_states)
+        states, state_codes = np.unique(sorted_sellers['seller_state'],
+                                        return_inverse=True)
+        self.states = states
+        one_hot = np.zeros((n, len(states)))
+        one_hot[np.arange(n), state_codes] = 1
+        self.state_sellers_removed = np.vstack(
+            [np.zeros(len(states)), np.cumsum(one_hot, axis=0)])
+        self.state_items_removed = np.vstack(
+            [np.zeros(len(states)), np.cumsum(one_hot * items[:, None], axis=0)])
+
+    def _clip(self, k):
+        """
+        Clamps `k` to the valid range [0, number of sellers]
+        """
+        return int(np.clip(k, 0, len(self.sorted_sellers)))
+
+    def best_k(self):
+        """
+        Returns the number of sellers to remove that maximises total profit
+        """
+        return int(np.argmax(self.profit_curve))
+
+    def removed_sellers(self, k):
+        """
+        Returns the worst `k` sellers as a DataFrame
+        """
+        return self.sorted_sellers.iloc[:self._clip(k)]
+
+    def removed_items(self, k):
+        """
+        Returns the order items sold by the worst `k` sellers
+        """
+        return self.order_items.iloc[:self.item_offsets[self._clip(k)]]
+
+    def state_impact(self, k):
+        """
+        Returns a DataFrame with:
+        'seller_state', 'sellers_removed', 'items_removed'
+        for the worst `k` sellers removed
+        """
+        k = self._clip(k)
+        return pd.DataFrame({
+            'seller_state': self.states,
+            'sellers_removed': self.state_sellers_removed[k].astype(int),
+            'items_removed': self.state_items_removed[k].astype(int)
+        })
+
+    def query(self, k):
+        """
+        Returns a dict with the impact of removing the worst `k` sellers:
+        'n_sellers_removed', 'profit', 'profits_lost', 'items_lost',
+        'customers_affected', 'state_impact'
+        """
+        k = self._clip(k)
+        return {
+            'n_sellers_removed': k,
+            'profit': self.profit_curve[k],
+            'profits_lost': self.profits_removed[k],
+            'items_lost': int(self.items_removed[k]),
+            'customers_affected': None if self.customers_affected is None
+                                  else int(self.customers_affected[k]),
+            'state_impact': self.state_impact(k)
+        }
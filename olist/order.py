@@ -9,9 +9,9 @@ class Order:
     DataFrames containing all orders as index,
     and various properties of these orders as columns
     '''
-    def __init__(self):
+    def __init__(self, data=None):
         # Assign an attribute ".data" to all new instances of Order
-        self.data = Olist().get_data()
+        self.data = Olist().get_data() if data is None else data
 
     def get_wait_time(self, is_delivered=True):
         """
@@ -6,11 +6,10 @@ from olist.order import Order
 
 
 class Product:
-    def __init__(self):
-        # Import data only once
-        olist = Olist()
-        self.data = olist.get_data()
-        self.order = Order()
+    def __init__(self, data=None):
+        # Import data only once, or share an already loaded `data` dict
+        self.data = Olist().get_data() if data is None else data
+        self.order = Order(self.data)
 
     def get_product_features(self):
         """
@@ -129,7 +128,6 @@ class Product:
         order_reviews['cost'] = order_reviews['review_score'].map({1: 100, 2: 50, 3: 40, 4: 0, 5: 0})
         orders_costs = orders.merge(order_reviews[['cost', 'order_id']], on='order_id')
         orders_costs_product = orders_costs.merge(order_items[['order_id', 'product_id']], on='order_id')
-        orders_costs_product.to_csv('orders_costs_product.csv')
         review_costs = orders_costs_product.groupby('product_id')['cost'].sum().reset_index()
         return review_costs
     
@@ -6,11 +6,10 @@ from olist.order import Order
 
 
 class Seller:
-    def __init__(self):
-        # Import data only once
-        olist = Olist()
-        self.data = olist.get_data()
-        self.order = Order()
+    def __init__(self, data=None):
+        # Import data only once, or share an already loaded `data` dict
+        self.data = Olist().get_data() if data is None else data
+        self.order = Order(self.data)
 
     def get_seller_features(self):
         """
@@ -0,0 +1,390 @@
+import argparse
+import ast
+import inspect
+import io
+import json
+import textwrap
+import threading
+from collections import OrderedDict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlsplit
+from urllib.request import urlopen
+
+import pandas as pd
+from olist.data import Olist
+from olist.order import Order
+from olist.product import Product
+from olist.seller import Seller
+
+try:
+    import pyarrow as pa
+except ImportError:  # Arrow is optional, csv is always available
+    pa = None
+
+ENTITIES = {'seller': Seller, 'product': Product, 'order': Order}
+
+# Query parameters that are not column filters
+RESERVED_PARAMS = {'columns', 'format'}
+
+FORMATS = ('arrow', 'csv')
+
+
+class FeatureError(Exception):
+    '''
+    A feature failed to compute or encode: a server error, not a bad request
+    '''
+
+
+class LRUCache:
+    '''
+    Thread-safe least-recently-used cache of encoded responses
+    '''
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key not in self._items:
+                return None
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                self._items.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class OlistService:
+    '''
+    Loads the Olist datasets once and serves the `get_*` features of
+    Seller, Product and Order, with filtering, column selection and
+    a response cache invalidated on reload.
+    '''
+    def __init__(self, cache_size=128):
+        self.cache = LRUCache(cache_size)
+        self._lock = threading.Lock()
+        self._generation = 0
+        self.reload()
+
+    def reload(self):
+        """
+        Reloads the csv files and invalidates all cached results
+        """
+        data = Olist().get_data()
+        entities = {name: cls(data) for name, cls in ENTITIES.items()}
+        with self._lock:
+            # Requests still running on the old data see the generation
+            # change and do not cache their results
+            self._generation += 1
+            self.entities = entities
+            self._features = {}
+            self._feature_locks = {}
+            self.cache.clear()
+
+    def list_features(self):
+        """
+        Returns a dict of the available features per entity
+        """
+        return {
+            name: sorted(method_name[len('get_'):]
+                         for method_name, method in inspect.getmembers(entity, inspect.ismethod)
+                         if method_name.startswith('get_') and not is_stub(method))
+            for name, entity in self.entities.items()
+        }
+
+    def get_feature(self, entity, feature, **kwargs):
+        """
+        Returns the DataFrame of `entity.get_<feature>(**kwargs)`,
+        computed once per set of arguments
+        """
+        with self._lock:
+            generation, entities = self._generation, self.entities
+        return self._get_feature(generation, entities, entity, feature, kwargs)
+
+    def _get_feature(self, generation, entities, entity, feature, kwargs):
+        method = get_method(entities, entity, feature)
+        key = (entity, feature, tuple(sorted(kwargs.items())))
+        with self._lock:
+            if generation == self._generation:
+                if key in self._features:
+                    return self._features[key]
+                feature_lock = self._feature_locks.setdefault(key, threading.Lock())
+            else:
+                feature_lock = threading.Lock()
+
+        # Only requests for the same feature wait for each other
+        with feature_lock:
+            with self._lock:
+                if generation == self._generation and key in self._features:
+                    return self._features[key]
+            try:
+                df = method(**kwargs)
+            except Exception as e:
+                raise FeatureError(f"Feature '{feature}' for '{entity}' failed: "
+                                   f"{short_message(e)}") from e
+            if not isinstance(df, pd.DataFrame):
+                raise KeyError(f"Feature '{feature}' for '{entity}' is not available")
+            # Some features are indexed by seller_id/product_id
+            if not isinstance(df.index, pd.RangeIndex):
+                df = df.reset_index()
+            with self._lock:
+                if generation == self._generation:
+                    self._features[key] = df
+            return df
+
+    def query(self, entity, feature, params):
+        """
+        Returns the encoded response and its content type for a request
+        on `entity/feature` with query `params` (dict of lists of str)
+        """
+        with self._lock:
+            generation, entities = self._generation, self.entities
+        fmt = params.get('format', ['arrow' if pa is not None else 'csv'])[0]
+        if fmt not in FORMATS:
+            raise ValueError(f"Unknown format '{fmt}'")
+        if fmt == 'arrow' and pa is None:
+            raise ValueError("format 'arrow' requires pyarrow")
+        key = (entity, feature, tuple(sorted((k, tuple(v)) for k, v in params.items())))
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        # Split method arguments from column filters
+        arguments = inspect.signature(get_method(entities, entity, feature)).parameters
+        kwargs = {k: parse_argument(arguments[k], v[0])
+                  for k, v in params.items() if k in arguments}
+        filters = {k: v for k, v in params.items()
+                   if k not in arguments and k not in RESERVED_PARAMS}
+
+        df = self._get_feature(generation, entities, entity, feature, kwargs)
+        for column, values in filters.items():
+            if column not in df.columns:
+                raise KeyError(f"Unknown column '{column}'")
+            values = [value for v in values for value in v.split(',')]
+            df = df[df[column].isin(parse_filter_values(df[column], values))]
+        if 'columns' in params:
+            columns = [c for v in params['columns'] for c in v.split(',')]
+            missing = set(columns) - set(df.columns)
+            if missing:
+                raise KeyError(f"Unknown columns {sorted(missing)}")
+            df = df[columns]
+
+        try:
+            response = encode(df.reset_index(drop=True), fmt)
+        except Exception as e:
+            raise FeatureError(f"Encoding '{feature}' for '{entity}' failed: "
+                               f"{short_message(e)}") from e
+        with self._lock:
+            if generation == self._generation:
+                self.cache.put(key, response)
+        return response
+
+
+def get_method(entities, entity, feature):
+    """
+    Returns the bound `get_<feature>` method of `entity`
+    """
+    if entity not in entities:
+        raise KeyError(f"Unknown entity '{entity}'")
+    method = getattr(entities[entity], f'get_{feature}', None)
+    if method is None:
+        raise KeyError(f"Unknown feature '{feature}' for '{entity}'")
+    return method
+
+
+def is_stub(method):
+    """
+    True if the body of `method` is only a docstring and `pass`
+    """
+    try:
+        source = textwrap.dedent(inspect.getsource(method))
+    except (OSError, TypeError):
+        return False
+    body = ast.parse(source).body[0].body
+    if body and isinstance(body[0], ast.Expr) and isinstance(body[0].value, ast.Constant):
+        body = body[1:]
+    return all(isinstance(statement, ast.Pass) for statement in body)
+
+
+def parse_argument(parameter, value):
+    """
+    Converts the query string `value` to the type of the default
+    of `parameter`. Raises ValueError if it cannot be converted.
+    """
+    default = parameter.default
+    if isinstance(default, bool):
+        return parse_bool(value, parameter.name)
+    if isinstance(default, (int, float)):
+        try:
+            return type(default)(value)
+        except ValueError:
+            raise ValueError(f"Invalid {type(default).__name__} '{value}' "
+                             f"for '{parameter.name}'") from None
+    return value
+
+
+def parse_bool(value, name):
+    """
+    Converts a query string flag to a bool. Raises ValueError otherwise.
+    """
+    if value.lower() in ('1', 'true', 'yes'):
+        return True
+    if value.lower() in ('0', 'false', 'no'):
+        return False
+    raise ValueError(f"Invalid boolean '{value}' for '{name}'")
+
+
+def parse_filter_values(column, values):
+    """
+    Converts the query string `values` to the dtype of `column`, so that
+    bool, numeric and datetime columns can be filtered.
+    Raises ValueError if a value cannot be converted.
+    """
+    dtype = column.dtype
+    try:
+        if pd.api.types.is_bool_dtype(dtype):
+            return [parse_bool(value, column.name) for value in values]
+        if pd.api.types.is_numeric_dtype(dtype):
+            return pd.to_numeric(values).tolist()
+        if pd.api.types.is_datetime64_any_dtype(dtype):
+            return pd.to_datetime(values).tolist()
+    except (ValueError, TypeError):
+        raise ValueError(f"Invalid value {values} for column "
+                         f"'{column.name}' of type {dtype}") from None
+    return values
+
+
+def short_message(e, max_length=200):
+    """
+    Returns a one-line, bounded description of exception `e`,
+    suitable for an HTTP reason phrase
+    """
+    message = f"{type(e).__name__}: {e}".splitlines()[0]
+    return message if len(message) <= max_length else message[:max_length] + '...'
+
+
+def encode(df, fmt='arrow'):
+    """
+    Encodes `df` as an Arrow IPC stream ('arrow') or csv ('csv').
+    Returns (bytes, content_type)
+    """
+    if fmt == 'arrow':
+        if pa is None:
+            raise ValueError("format 'arrow' requires pyarrow")
+        table = pa.Table.from_pandas(df, preserve_index=False)
+        sink = pa.BufferOutputStream()
+        with pa.ipc.new_stream(sink, table.schema) as writer:
+            writer.write_table(table)
+        return sink.getvalue().to_pybytes(), 'application/vnd.apache.arrow.stream'
+    if fmt == 'csv':
+        return df.to_csv(index=False).encode(), 'text/csv'
+    raise ValueError(f"Unknown format '{fmt}'")
+
+
+def decode(content, content_type):
+    """
+    Decodes a response body returned by the service into a DataFrame
+    """
+    if content_type == 'text/csv':
+        return pd.read_csv(io.BytesIO(content))
+    if pa is None:
+        raise ValueError("format 'arrow' requires pyarrow, use format='csv'")
+    return pa.ipc.open_stream(content).read_all().to_pandas()
+
+
+def make_handler(service, chunk_size=1 << 20):
+    """
+    Returns a request handler class bound to `service`
+    """
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlsplit(self.path)
+            parts = [p for p in url.path.split('/') if p]
+            try:
+                if not parts:
+                    body, content_type = encode_json(service.list_features())
+                elif len(parts) == 2:
+                    body, content_type = service.query(
+                        parts[0], parts[1], parse_qs(url.query))
+                else:
+                    raise KeyError(f"Unknown path '{url.path}'")
+            except FeatureError as e:
+                return self.send_error(500, str(e))
+            except KeyError as e:
+                return self.send_error(404, e.args[0])
+            except (ValueError, TypeError) as e:
+                return self.send_error(400, str(e))
+            except Exception as e:
+                return self.send_error(500, short_message(e))
+            self.send_body(body, content_type)
+
+        def do_POST(self):
+            if urlsplit(self.path).path.strip('/') != 'reload':
+                return self.send_error(404)
+            try:
+                service.reload()
+            except Exception as e:
+                return self.send_error(500, short_message(e))
+            self.send_body(*encode_json({'status': 'reloaded'}))
+
+        def send_body(self, body, content_type):
+            self.send_response(200)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            # Stream large responses in chunks
+            view = memoryview(body)
+            for start in range(0, len(body), chunk_size):
+                self.wfile.write(view[start:start + chunk_size])
+
+    return Handler
+
+
+def encode_json(obj):
+    return json.dumps(obj).encode(), 'application/json'
+
+
+def serve(host='127.0.0.1', port=8765, cache_size=128):
+    """
+    Loads the data once and serves it until interrupted
+    """
+    service = OlistService(cache_size=cache_size)
+    server = ThreadingHTTPServer((host, port), make_handler(service))
+    print(f"Serving Olist features on http://{host}:{port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+
+
+def fetch(entity, feature, url='http://127.0.0.1:8765', **params):
+    """
+    Client helper: returns `entity/feature` from a running service as a
+    DataFrame. List values in `params` are sent comma-separated, e.g.
+    fetch('seller', 'training_data', seller_state=['SP', 'RJ'],
+          columns=['seller_id', 'review_score'])
+    """
+    query = {k: ','.join(map(str, v)) if isinstance(v, (list, tuple)) else v
+             for k, v in params.items()}
+    with urlopen(f"{url}/{entity}/{feature}?{urlencode(query)}") as response:
+        return decode(response.read(), response.headers['Content-Type'])
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Serve Olist features over HTTP')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--cache-size', type=int, default=128)
+    args = parser.parse_args()
+    serve(args.host, args.port, args.cache_size)
@@ -1,6 +1,13 @@
 from math import radians, sin, cos, asin, sqrt
+import numpy as np
+import pandas as pd
 import matplotlib.pyplot as plt
 import seaborn as sns
+from patsy import dmatrices
+from scipy import stats
+
+__all__ = ['haversine_distance', 'return_significative_coef',
+           'return_significative_coef_by_group', 'plot_kde_plot']
 
 
 def haversine_distance(lon1, lat1, lon2, lat2):
@@ -33,6 +40,101 @@ def return_significative_coef(model):
                                                       ascending=False)
 
 
+def _ols_on_slices(X_values, y_values, bounds, alpha):
+    """
+    Fits OLS on each contiguous slice bounds[g]:bounds[g + 1] of the rows.
+    Returns coef, p_value, lower, upper (one row per slice) and the rank
+    of each slice's design.
+    """
+    n_groups, n_vars = len(bounds) - 1, X_values.shape[1]
+    n_obs = np.diff(bounds)
+    codes = np.repeat(np.arange(n_groups), n_obs)
+
+    # Stacked normal equations: one (X'X, X'y) per group
+    xtx = np.empty((n_groups, n_vars, n_vars))
+    xty = np.empty((n_groups, n_vars))
+    for g in range(n_groups):
+        X_g = X_values[bounds[g]:bounds[g + 1]]
+        xtx[g] = X_g.T @ X_g
+        xty[g] = X_g.T @ y_values[bounds[g]:bounds[g + 1]]
+
+    # Pseudo-inverse, as statsmodels, for rank-deficient designs
+    xtx_inv = np.linalg.pinv(xtx, hermitian=True)
+    coef = np.einsum('gij,gj->gi', xtx_inv, xty)
+    rank = np.linalg.matrix_rank(xtx, hermitian=True)
+
+    residuals = y_values - np.einsum('ni,ni->n', X_values, coef[codes])
+    df_resid = n_obs - rank
+    with np.errstate(divide='ignore', invalid='ignore'):
+        sigma2 = np.bincount(codes, weights=residuals**2,
+                             minlength=n_groups) / df_resid
+        std_err = np.sqrt(np.diagonal(xtx_inv, axis1=1, axis2=2) *
+                          sigma2[:, None])
+        t_values = coef / std_err
+    p_values = 2 * stats.t.sf(np.abs(t_values), df_resid[:, None])
+    t_crit = stats.t.ppf(1 - alpha / 2, df_resid[:, None])
+    return coef, p_values, coef - t_crit * std_err, coef + t_crit * std_err, rank
+
+
+def return_significative_coef_by_group(df, formula, by, alpha=0.05):
+    """
+    Fits the OLS `formula` separately for each group of `by` in a single
+    batch, and returns p_value, coef, lower and upper bound of the
+    significant coefficients of every group, stacked in one DataFrame.
+    Same estimates as fitting statsmodels' ols(formula, data=group) per group:
+    groups whose design is rank-deficient in the shared design matrix
+    (e.g. missing the reference level of a categorical) are refit on
+    their own design, with their own levels.
+    Rows whose `by` key is missing are dropped, as in groupby.
+    """
+    by = [by] if isinstance(by, str) else list(by)
+
+    # Like groupby, rows with a missing group key are left out.
+    # A positional index keeps the row lookups below unambiguous
+    df = df.dropna(subset=by).reset_index(drop=True)
+
+    # Build one design matrix for all groups, so columns are consistent
+    y, X = dmatrices(formula, df, return_type='dataframe')
+    codes, uniques = pd.MultiIndex.from_frame(df.loc[y.index, by]).factorize()
+    n_groups, n_vars = len(uniques), X.shape[1]
+
+    # Sort rows by group, so each group is a contiguous slice
+    order = np.argsort(codes, kind='stable')
+    bounds = np.concatenate([[0], np.cumsum(np.bincount(codes, minlength=n_groups))])
+    coef, p_values, lower, upper, rank = _ols_on_slices(
+        X.to_numpy()[order], y.to_numpy()[order, 0], bounds, alpha)
+
+    def to_frame(group, columns, coef, p_values, lower, upper):
+        result = pd.DataFrame({
+            'variable': np.tile(columns, len(group)),
+            'p_value': p_values.ravel(),
+            'coef': coef.ravel(),
+            'lower': lower.ravel(),
+            'upper': upper.ravel()
+        })
+        keys = group.loc[group.index.repeat(len(columns))].reset_index(drop=True)
+        return pd.concat([keys, result], axis=1)
+
+    groups = uniques.to_frame(index=False, name=by)
+    full_rank = rank == n_vars
+    results = [to_frame(groups[full_rank], X.columns, coef[full_rank],
+                        p_values[full_rank], lower[full_rank], upper[full_rank])]
+
+    # Refit rank-deficient groups on their own design, like statsmodels would
+    for g in np.flatnonzero(~full_rank):
+        rows = y.index[order[bounds[g]:bounds[g + 1]]]
+        y_g, X_g = dmatrices(formula, df.loc[rows], return_type='dataframe')
+        fit = _ols_on_slices(X_g.to_numpy(), y_g.to_numpy()[:, 0],
+                             np.array([0, len(y_g)]), alpha)
+        results.append(to_frame(groups.iloc[[g]], X_g.columns, *fit[:4]))
+    result = pd.concat(results, ignore_index=True)
+
+    # Groups without enough observations give NaN p_values and are dropped here
+    return result[result['p_value'] < alpha]\
+        .sort_values(by=by + ['coef'], ascending=[True] * len(by) + [False])\
+        .reset_index(drop=True)
+
+
 def plot_kde_plot(df, variable, dimension):
     """
     Plot a side by side kdeplot for `variable`, split